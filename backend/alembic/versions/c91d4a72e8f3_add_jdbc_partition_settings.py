@@ -0,0 +1,32 @@
+"""Add JDBC partition settings to data sources
+
+Revision ID: c91d4a72e8f3
+Revises: 54e1c31e605e
+Create Date: 2026-08-28 10:12:45.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c91d4a72e8f3'
+down_revision: Union[str, None] = '54e1c31e605e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('etl_data_sources', sa.Column('partition_column', sa.String(), nullable=True))
+    op.add_column('etl_data_sources', sa.Column('partition_lower', sa.Integer(), nullable=True))
+    op.add_column('etl_data_sources', sa.Column('partition_upper', sa.Integer(), nullable=True))
+    op.add_column('etl_data_sources', sa.Column('num_partitions', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('etl_data_sources', 'num_partitions')
+    op.drop_column('etl_data_sources', 'partition_upper')
+    op.drop_column('etl_data_sources', 'partition_lower')
+    op.drop_column('etl_data_sources', 'partition_column')
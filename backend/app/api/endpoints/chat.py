@@ -20,7 +20,7 @@ from app.schemas.chat import (
     BuilderResponse
 )
 from app.api.deps import get_current_active_user
-from app.services.llm_service import LLMService
+from app.services.llm_service import LLMService, LLMFactory
 from app.services.vector_store_service import VectorStoreFactory
 from app.models.etl import ETLDataSource
 from app.services.etl_service import ETLService
@@ -93,13 +93,13 @@ async def send_message(
 
         if not model_setting:
             # Use default settings if model not configured
-            llm_service = LLMService(
+            llm_service = LLMFactory.get_service(
                 model_name=request.model,
                 temperature=0.7,
                 max_tokens=2000
             )
         else:
-            llm_service = LLMService(
+            llm_service = LLMFactory.get_service(
                 model_name=model_setting.name,
                 api_key=model_setting.api_key,
                 temperature=model_setting.temperature,
@@ -376,13 +376,13 @@ async def generate_chart(
         model_setting = result.scalar_one_or_none()
         
         if model_setting:
-            llm_service = LLMService(
+            llm_service = LLMFactory.get_service(
                 model_name=model_setting.name,
                 api_key=model_setting.api_key,
                 temperature=0.1 
             )
         else:
-            llm_service = LLMService(model_name=request.model, temperature=0.1)
+            llm_service = LLMFactory.get_service(model_name=request.model, temperature=0.1)
 
         previous_messages = []
         last_chart_config = None
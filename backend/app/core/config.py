@@ -39,6 +39,36 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: Optional[str] = None
     ANTHROPIC_API_KEY: Optional[str] = None
 
+    # Conversation history window sent to the LLM: the first few "sink"
+    # turns anchor the conversation, the recent turns carry the context.
+    # Anything in between is dropped so prompt size stays bounded as
+    # conversations grow.
+    HISTORY_SINK_TURNS: int = 2
+    HISTORY_RECENT_TURNS: int = 8
+
+    # Semantic response cache: near-duplicate prompts (by embedding
+    # cosine similarity) reuse the cached answer instead of a fresh
+    # LLM call. Off by default — the first lookup loads an embedding
+    # model when no OpenAI key is configured.
+    SEMANTIC_CACHE_ENABLED: bool = False
+    SEMANTIC_CACHE_THRESHOLD: float = 0.92
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 512
+
+    # Cheap model tier for mechanical calls (NL->SQL, chart config,
+    # result summaries) — e.g. "gpt-4o-mini" or "claude-3-5-haiku".
+    # Unset means those calls use the primary model.
+    SMALL_MODEL_NAME: Optional[str] = None
+
+    # Cap on concurrent provider calls per pooled LLMService. Keeps a
+    # burst of requests from tripping provider rate limits and queueing
+    # behind 429 retries.
+    LLM_MAX_INFLIGHT: int = 16
+
+    # LangChain agent tracing. Verbose agents print every intermediate
+    # step synchronously, which blocks the event loop — keep off
+    # outside local debugging.
+    LANGCHAIN_VERBOSE: bool = False
+
     # Vector Store - ChromaDB
     CHROMA_HOST: str = "localhost"
     CHROMA_PORT: int = 8000
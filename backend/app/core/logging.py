@@ -0,0 +1,42 @@
+"""
+Application logging setup.
+
+Log records are handed to a queue and written by a background thread
+(QueueHandler + QueueListener), so async request handlers never block
+on a stdout flush. Call setup_logging() once at startup.
+"""
+import atexit
+import logging
+import logging.handlers
+import queue
+
+from app.core.config import settings
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+def setup_logging() -> None:
+    """
+    Route all app logging through an in-memory queue drained by a
+    background thread. Idempotent — repeat calls are no-ops.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue: queue.Queue = queue.Queue(-1)
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(
+        "%(asctime)s %(levelname)s %(name)s: %(message)s"
+    ))
+
+    root = logging.getLogger()
+    root.setLevel(logging.DEBUG if settings.DEBUG else logging.INFO)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -6,6 +6,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from app.core.config import settings
+from app.core.logging import setup_logging
 from app.db.database import init_db
 from app.api.endpoints import auth, chat, files, datasource
 from app.api.endpoints import settings as settings_router
@@ -18,6 +19,7 @@ async def lifespan(app: FastAPI):
     Lifespan context manager for startup and shutdown events.
     This replaces the deprecated @app.on_event decorators.
     """
+    setup_logging()
     print(f"Environment: {settings.ENVIRONMENT}")
     print(f"SECRET_KEY (first 10 chars): {settings.SECRET_KEY[:10]}...")
     await init_db()
@@ -26,6 +28,8 @@ async def lifespan(app: FastAPI):
     yield
 
     print("👋 Shutting down...")
+    from app.services.llm_models.http import close_shared_client
+    await close_shared_client()
 
 
 # Create FastAPI application
@@ -40,7 +40,15 @@ class ETLDataSource(Base):
     # Specifics
     table_name = Column(String, nullable=True)
     schema_json = Column(JSON, nullable=True) # Cached schema information
-    
+
+    # Optional partitioned JDBC read settings. When all four are set,
+    # Spark splits the read into parallel range queries on the column.
+    partition_column = Column(String, nullable=True)
+    partition_lower = Column(Integer, nullable=True)
+    partition_upper = Column(Integer, nullable=True)
+    num_partitions = Column(Integer, nullable=True)
+
+
     created_at = Column(DateTime, default=datetime.utcnow)
     
     user = relationship("User", back_populates="etl_data_sources")
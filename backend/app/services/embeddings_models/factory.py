@@ -1,10 +1,19 @@
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from langchain_core.embeddings import Embeddings
 from .base import EmbeddingBaseModel
 from .openai import OpenAIEmbeddingModel
 from .huggingface import HuggingFaceEmbeddingModel
 from app.core.config import settings
 
+# Built embedding models keyed by (provider, model, api_key). The
+# HuggingFace path loads ~86MB of SentenceTransformer weights per
+# construction, and VectorStoreService is built per request — sharing
+# one instance makes that a one-time cost and keeps RSS flat across
+# users. OpenAI instances are cheaper but still keep their tokenizer
+# and HTTP client warm.
+_EMBEDDING_CACHE: Dict[Tuple[str, str, Optional[str]], Embeddings] = {}
+
+
 class EmbeddingModelFactory:
     """
     Factory class to create Embedding models using registered strategies.
@@ -25,14 +34,24 @@ class EmbeddingModelFactory:
         Logic: If API key provided or in settings, try OpenAI. Else fallback to HuggingFace.
         """
         openai_key = api_key or settings.OPENAI_API_KEY
-        
+
         if openai_key:
-            return self.openai_strategy.create_embedding(
-                model_name=embedding_model,
-                api_key=openai_key
-            )
+            cache_key = ("openai", embedding_model, openai_key)
+            model = _EMBEDDING_CACHE.get(cache_key)
+            if model is None:
+                model = self.openai_strategy.create_embedding(
+                    model_name=embedding_model,
+                    api_key=openai_key
+                )
+                _EMBEDDING_CACHE[cache_key] = model
+            return model
         else:
-            print("No OpenAI API key found. Using local HuggingFace embeddings strategy.")
-            return self.huggingface_strategy.create_embedding(
-                model_name="sentence-transformers/all-MiniLM-L6-v2" # Force local model name or pass embedding_model if valid
-            )
+            cache_key = ("huggingface", "sentence-transformers/all-MiniLM-L6-v2", None)
+            model = _EMBEDDING_CACHE.get(cache_key)
+            if model is None:
+                print("No OpenAI API key found. Using local HuggingFace embeddings strategy.")
+                model = self.huggingface_strategy.create_embedding(
+                    model_name="sentence-transformers/all-MiniLM-L6-v2" # Force local model name or pass embedding_model if valid
+                )
+                _EMBEDDING_CACHE[cache_key] = model
+            return model
@@ -3,16 +3,64 @@ from langchain_huggingface.embeddings import HuggingFaceEmbeddings
 from langchain_core.embeddings import Embeddings
 from .base import EmbeddingBaseModel
 
+
+def _best_device() -> str:
+    """Pick the fastest available torch device: CUDA, then Apple MPS,
+    then CPU."""
+    try:
+        import torch
+        if torch.cuda.is_available():
+            return 'cuda'
+        if getattr(torch.backends, 'mps', None) and torch.backends.mps.is_available():
+            return 'mps'
+    except Exception:
+        pass
+    return 'cpu'
+
+
 class HuggingFaceEmbeddingModel(EmbeddingBaseModel):
     """
     Strategy for creating local HuggingFace Embeddings.
     """
-    
+
     def create_embedding(self, model_name: str, api_key: Optional[str] = None, **kwargs) -> Embeddings:
         # Default to a decent model if none specified (though usually handled by caller)
         model = model_name if model_name else "sentence-transformers/all-MiniLM-L6-v2"
-        return HuggingFaceEmbeddings(
+        device = _best_device()
+        embeddings = HuggingFaceEmbeddings(
             model_name=model,
-            model_kwargs={'device': 'cpu'},
-            encode_kwargs={'normalize_embeddings': True}
+            model_kwargs={'device': device},
+            # batch_size keeps large document lists in a few forward
+            # passes instead of sentence-transformers' default of 32;
+            # accelerators take much larger batches profitably
+            encode_kwargs={
+                'batch_size': 256 if device != 'cpu' else 64,
+                'normalize_embeddings': True,
+            }
         )
+        if device == 'cpu':
+            self._quantize_for_cpu(embeddings)
+        return embeddings
+
+    @staticmethod
+    def _quantize_for_cpu(embeddings: Embeddings) -> None:
+        """
+        Dynamically quantize the transformer's Linear layers to int8.
+        Roughly doubles CPU embedding throughput and halves the model's
+        memory at a recall loss that is negligible for retrieval; left
+        as-is if torch quantization isn't available on this build.
+        """
+        try:
+            import torch
+            # langchain_huggingface keeps the SentenceTransformer on
+            # _client; older releases exposed it as client
+            for attr in ('_client', 'client'):
+                st_model = getattr(embeddings, attr, None)
+                if st_model is not None:
+                    quantized = torch.quantization.quantize_dynamic(
+                        st_model, {torch.nn.Linear}, dtype=torch.qint8
+                    )
+                    object.__setattr__(embeddings, attr, quantized)
+                    break
+        except Exception as e:
+            print(f"Warning: int8 quantization unavailable, using FP32 embeddings: {e}")
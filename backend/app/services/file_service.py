@@ -3,33 +3,172 @@ File upload and processing service.
 Handles document uploads and text extraction for RAG.
 """
 import os
-import aiofiles
+import asyncio
+import hashlib
+import shutil
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import List, Optional
 from fastapi import UploadFile
 import pypdf
 from docx import Document as DocxDocument
 from pptx import Presentation
-import pandas as pd
-from bs4 import BeautifulSoup
+from selectolax.parser import HTMLParser
 from app.core.config import settings
 
 
+def _extract_pdf_page(path: str, page_idx: int, cache_dir: Optional[str] = None) -> str:
+    """Extract one page's text. Runs in a worker process: pypdf page
+    extraction is pure-Python CPU work, so threads gain nothing under
+    the GIL while pages are fully independent.
+
+    When cache_dir is given, the page's decoded content stream is
+    hashed and the extracted text cached per page, so re-ingesting a
+    PDF with a few edited pages only re-extracts those pages."""
+    with open(path, 'rb') as f:
+        reader = pypdf.PdfReader(f, strict=False)
+        page = reader.pages[page_idx]
+
+        cache_path = None
+        if cache_dir:
+            try:
+                contents = page.get_contents()
+                raw = contents.get_data() if contents is not None else b""
+                digest = hashlib.blake2b(raw, digest_size=16).hexdigest()
+                cache_path = os.path.join(cache_dir, f"{digest}.txt")
+                if os.path.exists(cache_path):
+                    with open(cache_path, 'r', encoding='utf-8') as cf:
+                        return cf.read()
+            except Exception:
+                # Malformed content streams fall back to plain extraction
+                cache_path = None
+
+        text = page.extract_text() or ""
+        if cache_path:
+            try:
+                with open(cache_path, 'w', encoding='utf-8') as cf:
+                    cf.write(text)
+            except OSError:
+                pass
+        return text
+
+
+def _pdf_page_count(path: str) -> int:
+    with open(path, 'rb') as f:
+        return len(pypdf.PdfReader(f, strict=False).pages)
+
+
+def _copy_fileobj(src, path: Path) -> None:
+    """Stream a file object to disk in 1MB chunks. Dispatched to a
+    thread once per upload; memory stays bounded by the chunk size."""
+    with open(path, 'wb') as dst:
+        shutil.copyfileobj(src, dst, length=1 << 20)
+
+
+def _read_text(path: str) -> str:
+    """Blocking read helper, dispatched to a thread once per file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def _write_text(path: Path, text: str) -> None:
+    path.write_text(text, encoding='utf-8')
+
+
+def _docx_to_text(path: str) -> str:
+    """Extract Word paragraph text. Runs in a worker process — the XML
+    parsing in python-docx is CPU-bound."""
+    doc = DocxDocument(path)
+    return '\n'.join(p.text for p in doc.paragraphs)
+
+
+def _pptx_to_text(path: str) -> str:
+    """Extract PowerPoint shape text. Runs in a worker process."""
+    prs = Presentation(path)
+    return '\n'.join(
+        shape.text
+        for slide in prs.slides
+        for shape in slide.shapes
+        if hasattr(shape, "text")
+    )
+
+
+def _excel_to_text(path: str) -> str:
+    """Read the first sheet with calamine (Rust-backed) and format rows
+    directly, skipping DataFrame construction and to_string()."""
+    from python_calamine import CalamineWorkbook
+    wb = CalamineWorkbook.from_path(path)
+    rows = wb.get_sheet_by_index(0).to_python()
+    return '\n'.join('\t'.join(map(str, row)) for row in rows)
+
+
+def _csv_to_text(path: str) -> str:
+    import csv
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return '\n'.join('\t'.join(row) for row in csv.reader(f))
+
+
+def _hash_file(path: str) -> str:
+    """Content hash used as the extraction cache key (streamed in 1MB
+    chunks so large files don't load into memory)."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while chunk := f.read(1 << 20):
+            h.update(chunk)
+    return h.hexdigest()
+
+
 class FileService:
     """Service for handling file uploads and text extraction."""
 
-    SUPPORTED_EXTENSIONS = {
+    SUPPORTED_EXTENSIONS = frozenset({
         '.pdf', '.txt', '.md',
         '.docx', '.doc',
         '.pptx', '.ppt',
         '.xlsx', '.xls', '.csv',
         '.html', '.htm'
-    }
+    })
+
+    # Shared worker pool for CPU-bound document parsing, built on first
+    # use and reused across requests
+    _process_pool: Optional[ProcessPoolExecutor] = None
+
+    @classmethod
+    def _get_process_pool(cls) -> ProcessPoolExecutor:
+        if cls._process_pool is None:
+            cls._process_pool = ProcessPoolExecutor(
+                max_workers=min(os.cpu_count() or 1, 6)
+            )
+        return cls._process_pool
 
     def __init__(self):
         """Initialize file service and create upload directory."""
         self.upload_dir = Path(settings.UPLOAD_DIR)
         self.upload_dir.mkdir(parents=True, exist_ok=True)
+        # Content-addressed extraction results: re-uploading identical
+        # bytes returns the cached text instead of re-parsing
+        self.extract_cache_dir = self.upload_dir / '.extract_cache'
+        self.extract_cache_dir.mkdir(exist_ok=True)
+        # Page-granular PDF cache for incremental re-ingest of edited
+        # documents
+        self.page_cache_dir = self.extract_cache_dir / 'pages'
+        self.page_cache_dir.mkdir(exist_ok=True)
+        # Extension -> parser dispatch, built once; adding a format is
+        # a single map entry
+        self._extractors = {
+            '.pdf': self._extract_from_pdf,
+            '.txt': self._extract_from_text,
+            '.md': self._extract_from_text,
+            '.docx': self._extract_from_docx,
+            '.doc': self._extract_from_docx,
+            '.pptx': self._extract_from_pptx,
+            '.ppt': self._extract_from_pptx,
+            '.xlsx': self._extract_from_excel,
+            '.xls': self._extract_from_excel,
+            '.csv': self._extract_from_excel,
+            '.html': self._extract_from_html,
+            '.htm': self._extract_from_html,
+        }
 
     async def save_upload_file(
         self,
@@ -49,8 +188,9 @@ class FileService:
         Raises:
             ValueError: If file type is not supported
         """
-        # Validate file extension
-        file_ext = Path(upload_file.filename).suffix.lower()
+        # Validate file extension (splitext avoids a PurePath allocation
+        # just to read the suffix)
+        file_ext = os.path.splitext(upload_file.filename)[1].lower()
         if file_ext not in self.SUPPORTED_EXTENSIONS:
             raise ValueError(
                 f"Unsupported file type: {file_ext}. "
@@ -64,9 +204,11 @@ class FileService:
         # Save file
         file_path = user_dir / upload_file.filename
 
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await upload_file.read()
-            await f.write(content)
+        # Stream to disk in bounded chunks instead of buffering the
+        # whole upload in memory; UploadFile.file is Starlette's spooled
+        # temp file, so the copy is a single thread hop
+        await upload_file.seek(0)
+        await asyncio.to_thread(_copy_fileobj, upload_file.file, file_path)
 
         return str(file_path)
 
@@ -83,84 +225,88 @@ class FileService:
         Raises:
             ValueError: If file type is not supported
         """
-        file_ext = Path(file_path).suffix.lower()
-
-        if file_ext == '.pdf':
-            return await self._extract_from_pdf(file_path)
-        elif file_ext == '.txt' or file_ext == '.md':
-            return await self._extract_from_text(file_path)
-        elif file_ext in ['.docx', '.doc']:
-            return await self._extract_from_docx(file_path)
-        elif file_ext in ['.pptx', '.ppt']:
-            return await self._extract_from_pptx(file_path)
-        elif file_ext in ['.xlsx', '.xls', '.csv']:
-            return await self._extract_from_excel(file_path)
-        elif file_ext in ['.html', '.htm']:
-            return await self._extract_from_html(file_path)
-        else:
+        file_ext = os.path.splitext(file_path)[1].lower()
+
+        digest = await asyncio.to_thread(_hash_file, file_path)
+        cache_path = self.extract_cache_dir / f"{digest}.txt"
+        if cache_path.exists():
+            return await asyncio.to_thread(_read_text, str(cache_path))
+
+        text = await self._extract_uncached(file_path, file_ext)
+        await asyncio.to_thread(_write_text, cache_path, text)
+        return text
+
+    async def _extract_uncached(self, file_path: str, file_ext: str) -> str:
+        """Dispatch to the parser for the file's extension."""
+        extractor = self._extractors.get(file_ext)
+        if extractor is None:
             raise ValueError(f"Unsupported file type: {file_ext}")
+        return await extractor(file_path)
 
     async def _extract_from_pdf(self, file_path: str) -> str:
-        """Extract text from PDF file."""
-        text = []
-        with open(file_path, 'rb') as file:
-            pdf_reader = pypdf.PdfReader(file)
-            for page in pdf_reader.pages:
-                text.append(page.extract_text())
-        return '\n'.join(text)
+        """Extract text from PDF file, one page per pool worker."""
+        num_pages = await asyncio.to_thread(_pdf_page_count, file_path)
+        if num_pages == 0:
+            return ""
+        page_cache = str(self.page_cache_dir)
+        if num_pages == 1:
+            # Not worth a process round-trip for a single page
+            return await asyncio.to_thread(_extract_pdf_page, file_path, 0, page_cache)
+
+        loop = asyncio.get_running_loop()
+        pool = self._get_process_pool()
+        pages = await asyncio.gather(*[
+            loop.run_in_executor(pool, _extract_pdf_page, file_path, i, page_cache)
+            for i in range(num_pages)
+        ])
+        return '\n'.join(pages)
 
     async def _extract_from_text(self, file_path: str) -> str:
         """Extract text from plain text file."""
-        async with aiofiles.open(file_path, 'r', encoding='utf-8') as file:
-            return await file.read()
+        return await asyncio.to_thread(_read_text, file_path)
 
     async def _extract_from_docx(self, file_path: str) -> str:
         """Extract text from Word document."""
-        doc = DocxDocument(file_path)
-        text = []
-        for paragraph in doc.paragraphs:
-            text.append(paragraph.text)
-        return '\n'.join(text)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_process_pool(), _docx_to_text, file_path
+        )
 
     async def _extract_from_pptx(self, file_path: str) -> str:
         """Extract text from PowerPoint presentation."""
-        prs = Presentation(file_path)
-        text = []
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if hasattr(shape, "text"):
-                    text.append(shape.text)
-        return '\n'.join(text)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_process_pool(), _pptx_to_text, file_path
+        )
+
+    async def batch_extract(self, file_paths: List[str]) -> List[str]:
+        """
+        Extract text from several files concurrently; the CPU-bound
+        parsers fan out across the shared process pool.
+        """
+        return list(await asyncio.gather(
+            *(self.extract_text(p) for p in file_paths)
+        ))
 
     async def _extract_from_excel(self, file_path: str) -> str:
-        """Extract text from Excel file."""
+        """Extract text from Excel/CSV file."""
         if file_path.endswith('.csv'):
-            df = pd.read_csv(file_path)
-        else:
-            df = pd.read_excel(file_path)
-
-        # Convert DataFrame to text
-        return df.to_string()
+            return await asyncio.to_thread(_csv_to_text, file_path)
+        return await asyncio.to_thread(_excel_to_text, file_path)
 
     async def _extract_from_html(self, file_path: str) -> str:
         """Extract text from HTML file."""
-        async with aiofiles.open(file_path, 'r', encoding='utf-8') as file:
-            html_content = await file.read()
+        html_content = await asyncio.to_thread(_read_text, file_path)
 
-        soup = BeautifulSoup(html_content, 'lxml')
+        tree = HTMLParser(html_content)
         # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.decompose()
-
-        # Get text
-        text = soup.get_text()
+        for tag in tree.css('script, style'):
+            tag.decompose()
 
-        # Clean up whitespace
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = '\n'.join(chunk for chunk in chunks if chunk)
-
-        return text
+        # text(strip=True) with a newline separator does the whitespace
+        # cleanup in C that the old generator pipeline did in Python
+        body = tree.body or tree.root
+        return body.text(separator='\n', strip=True) if body is not None else ""
 
     async def chunk_text(
         self,
@@ -178,14 +324,32 @@ class FileService:
 
         Returns:
             List of text chunks
+
+        Raises:
+            ValueError: If chunk_overlap is not smaller than chunk_size
         """
-        chunks = []
-        start = 0
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+
+        # Single comprehension over precomputed bounds; the slicing loop
+        # runs in C instead of stepping the interpreter per chunk
+        step = chunk_size - chunk_overlap
+        return [text[i:i + chunk_size] for i in range(0, len(text), step)]
 
-        while start < len(text):
-            end = start + chunk_size
-            chunk = text[start:end]
-            chunks.append(chunk)
-            start = end - chunk_overlap
+    async def chunk_text_iter(
+        self,
+        text: str,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200
+    ):
+        """
+        Async generator variant of chunk_text, for consumers that want
+        to embed chunks as they stream instead of materializing the
+        whole list.
+        """
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
 
-        return chunks
+        step = chunk_size - chunk_overlap
+        for i in range(0, len(text), step):
+            yield text[i:i + chunk_size]
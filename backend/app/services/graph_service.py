@@ -1,12 +1,61 @@
-from typing import TypedDict, List, Optional, Any, Dict, Annotated, Literal
+import re
+import orjson
+from typing import TypedDict, List, Optional, Any, Dict, Tuple, Annotated, Literal
 from langgraph.graph import StateGraph, END
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
 from langgraph.graph.message import add_messages
 from app.services.llm_service import LLMService
 
+# Routing labels keyed by (normalized message, have-data flag). Repeat
+# prompts skip the classification LLM round-trip entirely; evicted
+# FIFO once full.
+_route_cache: Dict[Tuple[str, bool], str] = {}
+_ROUTE_CACHE_MAX = 2048
+
+
+def _normalize_query(text: str) -> str:
+    return re.sub(r"\s+", " ", text.strip().lower())
+
+
+# Built once so every routing call sends byte-identical prompt bytes —
+# provider-side prompt caching keys on the identical system prefix
+_ROUTER_SYSTEM = SystemMessage(content="""You are a routing agent for a BI Dashboard AI.
+    Your job is to classify the user's message into one of THREE paths:
+
+    1. 'sql_gen': The user is asking for NEW data, metrics, or filtering changes that require a database query.
+       Examples: "Show me sales", "Filter by region", "What is the revenue?".
+
+    2. 'chart_gen': The user wants to change the VISUALIZATION style of the CURRENT data.
+       Examples: "Make it a bar chart", "Change color to red", "Show labels".
+       (Only usage valid if we already have data).
+
+    3. 'responder': General chat, greeting, or clarifying question.
+       Examples: "Hi", "What can you do?", "Thanks".
+
+    Return ONLY one of these words: 'sql_gen', 'chart_gen', or 'responder'.
+    """)
+
+
+# Error classes a reworded query can't fix — retrying the LLM on these
+# just burns a round-trip per attempt. Scoped to permissions and
+# missing relations/tables only: `column "x" does not exist` is the
+# prototypical *fixable* NL-to-SQL error (misspelled column) and must
+# still reach the fixer.
+_UNFIXABLE_SQL_ERROR = re.compile(
+    r"permission denied|access denied|no such table"
+    r"|relation .* does not exist|table .* does not exist",
+    re.IGNORECASE,
+)
+
 
 class AgentState(TypedDict):
-    messages: Annotated[List[BaseMessage], add_messages] 
+    # User-visible conversation only. Returning this key triggers the
+    # add_messages merge over the whole history, so intermediate LLM
+    # exchanges belong in scratch_messages instead.
+    messages: Annotated[List[BaseMessage], add_messages]
+    # Transient per-turn exchanges (router/fixer probes); plain list,
+    # overwritten rather than merged
+    scratch_messages: Optional[List[BaseMessage]]
     user_id: str
     dashboard_id: Optional[str]
     connection_string: Any # SQLAlchemy Engine
@@ -15,12 +64,15 @@ class AgentState(TypedDict):
     sql_query: Optional[str]
     query_result: Optional[List[Dict]]
     chart_config: Optional[Dict]
+    # Ready-to-send serialization of chart_config (pydantic Rust core);
+    # callers that only forward JSON can use it and skip re-encoding
+    chart_config_json: Optional[str]
     error: Optional[str]
     retry_count: int
     next_step: Optional[Literal["sql_gen", "chart_gen", "responder", "error"]]
 
 
-def router_node(state: AgentState):
+async def router_node(state: AgentState):
     """
     Decides next step based on prompt and current state.
     """
@@ -32,38 +84,31 @@ def router_node(state: AgentState):
     if not state.get("connection_string"):
         return {"next_step": "responder"}
 
-    system_prompt = """You are a routing agent for a BI Dashboard AI.
-    Your job is to classify the user's message into one of THREE paths:
-    
-    1. 'sql_gen': The user is asking for NEW data, metrics, or filtering changes that require a database query.
-       Examples: "Show me sales", "Filter by region", "What is the revenue?".
-       
-    2. 'chart_gen': The user wants to change the VISUALIZATION style of the CURRENT data.
-       Examples: "Make it a bar chart", "Change color to red", "Show labels".
-       (Only usage valid if we already have data).
-       
-    3. 'responder': General chat, greeting, or clarifying question.
-       Examples: "Hi", "What can you do?", "Thanks".
-       
-    Return ONLY one of these words: 'sql_gen', 'chart_gen', or 'responder'.
-    """
-    
-    response = llm_service.llm.invoke([
-        SystemMessage(content=system_prompt),
+    has_data = bool(state.get("query_result"))
+    cache_key = (_normalize_query(str(last_message.content)), has_data)
+    cached_step = _route_cache.get(cache_key)
+    if cached_step is not None:
+        return {"next_step": cached_step}
+
+    response = await llm_service.llm.ainvoke([
+        _ROUTER_SYSTEM,
         last_message
     ])
     
     choice = response.content.strip().lower()
-    
+
     if "chart" in choice:
-        if state.get("query_result"):
-             return {"next_step": "chart_gen"}
-        else:
-             return {"next_step": "sql_gen"}
+        next_step = "chart_gen" if has_data else "sql_gen"
     elif "sql" in choice:
-        return {"next_step": "sql_gen"}
+        next_step = "sql_gen"
     else:
-        return {"next_step": "responder"}
+        next_step = "responder"
+
+    if len(_route_cache) >= _ROUTE_CACHE_MAX:
+        _route_cache.pop(next(iter(_route_cache)))
+    _route_cache[cache_key] = next_step
+
+    return {"next_step": next_step}
 
 
 
@@ -126,12 +171,21 @@ async def chart_configurator_node(state: AgentState):
         previous_config=previous_config
     )
     
-    if hasattr(config, "model_dump"):
-        config_dict = config.model_dump()
+    if hasattr(config, "model_dump_json"):
+        # Serialize in pydantic's Rust core and parse back with orjson;
+        # faster than the Python-level model_dump() dict rebuild and the
+        # JSON string is reusable downstream as-is
+        config_json = config.model_dump_json()
+        config_dict = orjson.loads(config_json)
     else:
+        config_json = None
         config_dict = config
-        
-    return {"chart_config": config_dict, "next_step": "responder"}
+
+    return {
+        "chart_config": config_dict,
+        "chart_config_json": config_json,
+        "next_step": "responder"
+    }
 
 
 async def sql_fixer_node(state: AgentState):
@@ -146,7 +200,12 @@ async def sql_fixer_node(state: AgentState):
     
     if retry_count >= 3:
         return {"next_step": "responder", "messages": [AIMessage(content=f"I tried to fix the query 3 times but failed. Error: {error}")]}
-        
+
+    if error and _UNFIXABLE_SQL_ERROR.search(error):
+        # Missing tables/permissions won't be fixed by rephrasing the
+        # SQL; fail fast instead of spending LLM retries
+        return {"next_step": "responder", "messages": [AIMessage(content=f"I can't fix this query automatically. Error: {error}")]}
+
     system_prompt = f"""The following SQL query failed:
     ```sql
     {bad_sql}
@@ -213,6 +272,12 @@ def after_exec_decision(state: AgentState):
     return "chart_gen"
 
 def after_fix_decision(state: AgentState):
+    # sql_fixer_node sets next_step="responder" when it gives up
+    # (retry budget exhausted or unfixable error) — honour it so the
+    # fail-fast path actually terminates instead of looping back to
+    # sql_exec until the recursion limit trips
+    if state.get("next_step") == "responder":
+        return "responder"
     if state.get("retry_count", 0) >= 3:
         return "responder"
     return "sql_exec"
@@ -1,3 +1,3 @@
-from .factory import LLMModelFactory
+from .factory import LLMModelFactory, get_factory
 
-__all__ = ["LLMModelFactory"]
+__all__ = ["LLMModelFactory", "get_factory"]
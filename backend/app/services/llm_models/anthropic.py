@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Optional, Tuple
 from langchain_anthropic import ChatAnthropic
 from langchain_core.language_models.chat_models import BaseChatModel
 from .base import LLMBaseModel
@@ -9,9 +9,8 @@ class AnthropicModel(LLMBaseModel):
     Strategy for creating Anthropic Claude Models.
     """
 
-    def is_provider_for(self, model_name: str) -> bool:
-        model_lower = model_name.lower()
-        return any(x in model_lower for x in ['claude', 'anthropic'])
+    def provider_tokens(self) -> Tuple[str, ...]:
+        return ('claude', 'anthropic')
 
     def create_model(
         self,
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Optional, Any
+from typing import Optional, Any, Tuple
 from langchain_core.language_models.chat_models import BaseChatModel
 
 class LLMBaseModel(ABC):
@@ -7,7 +7,7 @@ class LLMBaseModel(ABC):
     Abstract base class for LLM provider strategies.
     Different providers (OpenAI, Anthropic, etc.) should implement this interface.
     """
-    
+
     @abstractmethod
     def create_model(
         self,
@@ -23,8 +23,16 @@ class LLMBaseModel(ABC):
         pass
 
     @abstractmethod
+    def provider_tokens(self) -> Tuple[str, ...]:
+        """
+        Lowercase substrings that identify this provider's model names.
+        The factory builds its dispatch table from these once.
+        """
+        pass
+
     def is_provider_for(self, model_name: str) -> bool:
         """
         Determines if this strategy handles the given model name.
         """
-        pass
+        model_lower = model_name.lower()
+        return any(t in model_lower for t in self.provider_tokens())
@@ -1,4 +1,5 @@
-from typing import List, Optional
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Any
 from langchain_core.language_models.chat_models import BaseChatModel
 from .base import LLMBaseModel
 from .openai import OpenAIModel
@@ -9,38 +10,61 @@ class LLMModelFactory:
     Factory class to create LLM models using registered models.
     Implements the Strategy Pattern context.
     """
-    
+
     def __init__(self):
         # Register available models
         self.models: List[LLMBaseModel] = [
             OpenAIModel(),
             AnthropicModel()
         ]
+        # Dispatch table built once: (token tuple, strategy) pairs, so
+        # create_llm lowercases the name a single time instead of
+        # re-scanning through is_provider_for per call
+        self._dispatch: List[Tuple[Tuple[str, ...], LLMBaseModel]] = [
+            (m.provider_tokens(), m) for m in self.models
+        ]
+        # Constructed chat models keyed by their full parameter set;
+        # rebuilding a ChatOpenAI/ChatAnthropic per request would drop
+        # its httpx connection pool every time
+        self._model_cache: Dict[Tuple[str, float, int, Optional[str]], BaseChatModel] = {}
+
+    def _resolve(self, model_lower: str) -> LLMBaseModel:
+        for tokens, strategy in self._dispatch:
+            if any(t in model_lower for t in tokens):
+                return strategy
+        # Default to OpenAI for unknown names
+        return self.models[0]
 
     def create_llm(
-        self, 
-        model_name: str, 
-        temperature: float, 
-        max_tokens: int, 
+        self,
+        model_name: str,
+        temperature: float,
+        max_tokens: int,
         api_key: Optional[str] = None
     ) -> BaseChatModel:
         """
-        Iterates through registered models to find one that supports the model_name.
+        Returns the chat model for the given parameters, reusing a
+        cached instance when one was already built.
         """
-        for model in self.models:
-            if model.is_provider_for(model_name):
-                return model.create_model(
-                    model_name=model_name,
-                    temperature=temperature,
-                    max_tokens=max_tokens,
-                    api_key=api_key
-                )
-        
-       
-        fallback_model = OpenAIModel()
-        return fallback_model.create_model(
-            model_name=model_name,
-            temperature=temperature,
-            max_tokens=max_tokens,
-            api_key=api_key
-        )
+        cache_key = (model_name, temperature, max_tokens, api_key)
+        model = self._model_cache.get(cache_key)
+        if model is None:
+            strategy = self._resolve(model_name.lower())
+            model = strategy.create_model(
+                model_name=model_name,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                api_key=api_key
+            )
+            self._model_cache[cache_key] = model
+        return model
+
+
+@lru_cache(maxsize=1)
+def get_factory() -> LLMModelFactory:
+    """
+    Process-wide factory singleton. Sharing one factory shares its
+    model cache, so chat models (and their provider connections)
+    survive across requests instead of being rebuilt per call site.
+    """
+    return LLMModelFactory()
@@ -0,0 +1,28 @@
+"""
+Shared httpx transport for provider chat clients.
+
+Each ChatOpenAI otherwise builds its own httpx client, so distinct
+model configurations keep separate keep-alive pools and bursty traffic
+pays a fresh TCP+TLS handshake (~100-300 ms) per new connection. One
+process-wide AsyncClient lets every model reuse warm connections.
+"""
+from functools import lru_cache
+import httpx
+
+
+@lru_cache(maxsize=1)
+def get_shared_async_client() -> httpx.AsyncClient:
+    """Process-wide async HTTP client, created on first use."""
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=2000,
+            max_keepalive_connections=1500,
+        ),
+        timeout=httpx.Timeout(120.0),
+    )
+
+
+async def close_shared_client() -> None:
+    """Close the shared client if it was created. Call at shutdown."""
+    if get_shared_async_client.cache_info().currsize:
+        await get_shared_async_client().aclose()
@@ -1,17 +1,17 @@
-from typing import Optional
+from typing import Optional, Tuple
 from langchain_openai import ChatOpenAI
 from langchain_core.language_models.chat_models import BaseChatModel
 from .base import LLMBaseModel
+from .http import get_shared_async_client
 from app.core.config import settings
 
 class OpenAIModel(LLMBaseModel):
     """
     Strategy for creating OpenAI Chat Models.
     """
-    
-    def is_provider_for(self, model_name: str) -> bool:
-        model_lower = model_name.lower()
-        return any(x in model_lower for x in ['gpt-4', 'gpt-3.5', 'gpt4', 'gpt3', 'o1-mini', 'gpt', 'openai'])
+
+    def provider_tokens(self) -> Tuple[str, ...]:
+        return ('gpt-4', 'gpt-3.5', 'gpt4', 'gpt3', 'o1-mini', 'gpt', 'openai')
 
     def create_model(
         self,
@@ -25,5 +25,8 @@ class OpenAIModel(LLMBaseModel):
             model=model_name,
             temperature=temperature,
             max_tokens=max_tokens,
-            api_key=api_key or settings.OPENAI_API_KEY
+            api_key=api_key or settings.OPENAI_API_KEY,
+            # All async calls ride the shared connection pool, so
+            # distinct model configs reuse warm TLS connections
+            http_async_client=get_shared_async_client()
         )
@@ -2,6 +2,15 @@
 LLM Service - Integrates with OpenAI, Anthropic, and other LLM providers using LangChain.
 Handles message history, conversation context, and model selection.
 """
+import asyncio
+import hashlib
+import logging
+import re
+import time
+import unicodedata
+import orjson
+import tiktoken
+from functools import lru_cache
 from typing import List, Dict, Any, Optional, Tuple
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, BaseMessage, ToolMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
@@ -11,7 +20,260 @@ from langchain_core.tools import Tool
 from app.core.config import settings
 from app.models.message import Message as DBMessage
 from app.schemas.chart import ChartConfig
-from app.services.llm_models import LLMModelFactory
+from app.services.llm_models import get_factory
+
+logger = logging.getLogger(__name__)
+
+
+# Reflected SQLDatabase handles keyed by connection URL. Reflection
+# round-trips the DB catalog, so repeat turns on the same datasource
+# must not repay it; keying on the URL keeps the entry valid across
+# engine rebuilds. Schema DDL on the target requires a process restart
+# (or future explicit invalidation) to pick up.
+_sqldb_cache: Dict[str, Tuple[SQLDatabase, str, str]] = {}
+
+
+def _get_cached_db(engine) -> Tuple[SQLDatabase, str, str]:
+    """Return (SQLDatabase, table_info, dialect) for an engine,
+    reflecting at most once per connection URL."""
+    key = str(engine.url)
+    cached = _sqldb_cache.get(key)
+    if cached is None:
+        db = SQLDatabase(engine=engine)
+        cached = (db, db.get_table_info(), str(db.dialect))
+        _sqldb_cache[key] = cached
+    return cached
+
+
+# Exact-match result caches for the NL->SQL and chart-config calls.
+# Dashboards re-ask near-identical questions constantly, and a hit
+# returns in microseconds instead of a full LLM round-trip. In-process
+# TTL store with lazy expiry and FIFO eviction.
+_RESULT_CACHE: Dict[str, Tuple[float, Any]] = {}
+_RESULT_CACHE_TTL = 3600.0
+_RESULT_CACHE_MAX = 1024
+
+
+def _normalize_message(s: str) -> str:
+    return unicodedata.normalize("NFKC", s).strip().lower()
+
+
+def _cache_key(*parts: str) -> str:
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(p.encode('utf-8', 'replace'))
+        h.update(b'\x00')
+    return h.hexdigest()
+
+
+def _cache_get(key: str) -> Any:
+    entry = _RESULT_CACHE.get(key)
+    if entry is None:
+        return None
+    ts, value = entry
+    if time.monotonic() - ts > _RESULT_CACHE_TTL:
+        _RESULT_CACHE.pop(key, None)
+        return None
+    return value
+
+
+def _cache_put(key: str, value: Any) -> None:
+    if len(_RESULT_CACHE) >= _RESULT_CACHE_MAX:
+        _RESULT_CACHE.pop(next(iter(_RESULT_CACHE)), None)
+    _RESULT_CACHE[key] = (time.monotonic(), value)
+
+
+# Converted LangChain histories keyed by (conversation_id, last
+# message id, length). A conversation's prefix is immutable, so one
+# turn's conversion serves every call of that turn and the next turn
+# only misses once. Values are tuples; callers get a fresh list.
+_HISTORY_CACHE: Dict[Tuple[int, int, int], Tuple[BaseMessage, ...]] = {}
+_HISTORY_CACHE_MAX = 1024
+
+# DB message type -> LangChain class. MessageType is a str enum, so
+# both the enum member and its raw value hash to the same key.
+_MSG_CLS = {"human": HumanMessage, "ai": AIMessage}
+
+
+def _extract_text(content: Any) -> str:
+    """
+    Extract text from a response content payload, which may be a plain
+    string or a list of content blocks. Exact type checks instead of
+    isinstance: message content is always built from plain str/dict/list,
+    and `type(x) is dict` skips the MRO walk on every block.
+    """
+    if type(content) is str:
+        return content
+    if type(content) is list:
+        return ''.join(
+            block.get('text', '') if type(block) is dict else block
+            for block in content
+            if (type(block) is dict and block.get('type') == 'text')
+            or type(block) is str
+        )
+    return str(content)
+
+
+def _fmt_human(msg: HumanMessage) -> Optional[Dict[str, Any]]:
+    return {"type": "human", "data": {"content": msg.content}}
+
+
+def _fmt_ai(msg: AIMessage) -> Optional[Dict[str, Any]]:
+    text_content = _extract_text(msg.content)
+    # AIMessages that are only tool calls carry no text — drop them
+    if not text_content:
+        return None
+    return {"type": "ai", "data": {"content": text_content}}
+
+
+# type -> formatter for frontend-facing history. Dict lookup on the
+# concrete type replaces the per-message isinstance chain; absent
+# types (ToolMessage, SystemMessage) fall out naturally.
+_FORMAT_DISPATCH = {HumanMessage: _fmt_human, AIMessage: _fmt_ai}
+
+
+# Markdown-fence / "SQLQuery:" cleanup for model-produced SQL,
+# compiled once. Two passes: strip the fences first, then drop any
+# leading chatter up to the first SQLQuery: tag.
+_SQL_FENCE_RE = re.compile(r"^\s*```(?:sql)?\s*|\s*```\s*$", re.IGNORECASE)
+_SQL_QUERY_TAG_RE = re.compile(r"^.*?SQLQuery:\s*", re.IGNORECASE | re.DOTALL)
+
+
+def _clean_sql(sql: str) -> str:
+    return _SQL_QUERY_TAG_RE.sub("", _SQL_FENCE_RE.sub("", sql), count=1).strip()
+
+
+@lru_cache(maxsize=8)
+def _get_token_encoder(model_name: str):
+    """Tokenizer for a model, loaded once. Unknown model names (e.g.
+    Anthropic's) fall back to cl100k_base, which is close enough for
+    budgeting purposes."""
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def _truncate_to_tokens(text: str, budget: int, model_name: str) -> str:
+    """Cut `text` to at most `budget` tokens; returns it unchanged when
+    already within budget."""
+    enc = _get_token_encoder(model_name)
+    tokens = enc.encode(text)
+    if len(tokens) <= budget:
+        return text
+    return enc.decode(tokens[:budget]) + "\n... (truncated)"
+
+
+class _SemanticCache:
+    """
+    Nearest-neighbour response cache over prompt embeddings. Rephrased
+    duplicates ("show sales by region" vs "sales per region please")
+    miss the exact-match _RESULT_CACHE but land within cosine
+    threshold here, turning a multi-second LLM call into an embedding
+    plus one matrix product.
+
+    Exact search over a numpy matrix rather than a FAISS index: the
+    store is FIFO-capped at a few hundred entries, where one BLAS
+    matvec is already microseconds and adds no native dependency.
+    Embeddings come from the app's embedding factory, loaded lazily on
+    first use; if that fails the cache disables itself.
+    """
+
+    def __init__(self, threshold: float, max_entries: int):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._vectors = None  # np.ndarray [n, d], rows L2-normalized
+        self._values: List[str] = []
+        self._embeddings = None
+        self._disabled = False
+
+    def _embed(self, text: str):
+        import numpy as np
+        if self._embeddings is None:
+            if self._disabled:
+                return None
+            try:
+                from app.services.embeddings_models import EmbeddingModelFactory
+                self._embeddings = EmbeddingModelFactory().create_embedding_model(
+                    embedding_model="text-embedding-3-small"
+                )
+            except Exception as e:
+                logger.warning("Semantic cache disabled, no embedding model: %s", e)
+                self._disabled = True
+                return None
+        vec = np.asarray(self._embeddings.embed_query(text), dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def lookup(self, text: str):
+        """Return (query_vector, cached_value_or_None). Synchronous —
+        run in a worker thread."""
+        vec = self._embed(text)
+        if vec is None or self._vectors is None or not len(self._values):
+            return vec, None
+        scores = self._vectors @ vec
+        best = int(scores.argmax())
+        if scores[best] >= self.threshold:
+            return vec, self._values[best]
+        return vec, None
+
+    def store(self, vec, value: str) -> None:
+        import numpy as np
+        if vec is None:
+            return
+        if self._vectors is None:
+            self._vectors = vec[None, :]
+            self._values = [value]
+            return
+        if len(self._values) >= self.max_entries:
+            self._vectors = self._vectors[1:]
+            self._values = self._values[1:]
+        self._vectors = np.vstack([self._vectors, vec[None, :]])
+        self._values.append(value)
+
+
+_SEM_CACHE = _SemanticCache(
+    threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+    max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES,
+)
+
+
+# Chart prompt parsed once at import; the per-call variables
+# (columns, sample, refinement context, user message) stay template
+# inputs so the compiled template is shared by every instance.
+_CHART_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert Data Visualization Architect using MUI X Charts.
+Your goal is to choose the best chart type to visualize the provided data based on the user's request.
+Internalize the data structure and schema.
+
+Input Context:
+- Columns: {columns}
+- Data Sample (first 5 rows): {data_sample}
+
+{refinement_context}
+"""),
+    ("human", "{user_message}"),
+])
+
+# RAG system prompt frozen at module scope. A fixed layout matters
+# beyond CPU: provider prefix caches key on byte-identical prompts, so
+# the same doc set re-asked produces the same system block every time.
+_RAG_SYSTEM_TEMPLATE = """You are a helpful assistant. Use the following context to answer the user's question.
+If you cannot find the answer in the context, say so clearly.
+
+Context:
+{context}
+
+Answer the question based on the context above."""
+
+_CHART_FRESH_RULES = """
+Rules:
+1. Choose 'bar', 'line', 'pie', or 'scatter' appropriate for the data.
+2. Map 'series' and 'xAxis' correctly.
+3. For Bar/Line charts: 'xAxis' usually contains the labels/categories (scaleType='band' for categories, 'point' for time/linear).
+4. `series` data MUST be extracted from the provided `data_sample`.
+5. Return a valid JSON matching the ChartConfig schema.
+"""
 
 
 class LLMService:
@@ -40,11 +302,79 @@ class LLMService:
         self.temperature = temperature
         self.max_tokens = max_tokens
         
-        # Initialize Strategy Factory
-        self.model_factory = LLMModelFactory()
+        # Shared Strategy Factory (process-wide, keeps model cache warm)
+        self.model_factory = get_factory()
         
         self.llm = self._initialize_model(model_name, api_key)
+
+        # Cheaper tier for mechanical calls (SQL generation, chart
+        # config, result summaries): smaller models decode several
+        # times faster and these prompts don't need the flagship.
+        # Server-configured keys apply — the small model may belong to
+        # a different provider than the user's key.
+        self._small_llm = self.llm
+        if settings.SMALL_MODEL_NAME and settings.SMALL_MODEL_NAME != model_name:
+            try:
+                self._small_llm = self.model_factory.create_llm(
+                    model_name=settings.SMALL_MODEL_NAME,
+                    temperature=self.temperature,
+                    max_tokens=self.max_tokens
+                )
+            except Exception as e:
+                logger.warning(
+                    "Small model %s unavailable, using %s: %s",
+                    settings.SMALL_MODEL_NAME, model_name, e
+                )
+
         self.tools = self._initialize_tools()
+        # O(1) lookup for tool dispatch instead of scanning self.tools
+        # per tool call
+        self._tools_by_name = {tool.name: tool for tool in self.tools}
+        # Bound once — bind_tools reserializes every tool schema on
+        # each call, which is pure per-request overhead for a fixed
+        # tool set
+        self.llm_with_tools = self.llm.bind_tools(self.tools)
+        # Chart chains built once per instance: with_structured_output
+        # derives the ChartConfig schema and binds it at build time, so
+        # requests skip the prompt parse + schema binding entirely.
+        # Default tier is the small model; the primary variant backs
+        # model_tier="primary" overrides.
+        self._chart_chain = _CHART_PROMPT | self._small_llm.with_structured_output(ChartConfig)
+        if self._small_llm is self.llm:
+            self._chart_chain_primary = self._chart_chain
+        else:
+            self._chart_chain_primary = _CHART_PROMPT | self.llm.with_structured_output(ChartConfig)
+        # Shared by everyone using this pooled instance — caps
+        # concurrent provider calls so bursts queue here instead of at
+        # the provider's rate limiter
+        self._inflight = asyncio.Semaphore(settings.LLM_MAX_INFLIGHT)
+
+        # Best-effort TLS warmup so the first real call doesn't pay
+        # TCP+TLS setup (~100-300ms); skipped when constructed outside
+        # an event loop (scripts, tests)
+        try:
+            asyncio.get_running_loop().create_task(self._warm_connection())
+        except RuntimeError:
+            pass
+
+    async def _warm_connection(self) -> None:
+        """
+        Open a connection to the provider ahead of the first request.
+        Only the OpenAI host rides the shared httpx pool; Anthropic's
+        client manages its own transport, so there is nothing of ours
+        to warm for it. Failures are irrelevant — the real call will
+        surface them.
+        """
+        model_lower = self.model_name.lower()
+        if 'claude' in model_lower or 'anthropic' in model_lower:
+            return
+        try:
+            from app.services.llm_models.http import get_shared_async_client
+            await get_shared_async_client().head(
+                "https://api.openai.com/v1/models", timeout=10.0
+            )
+        except Exception:
+            pass
 
     def _initialize_model(self, model_name: str, api_key: Optional[str] = None):
         """
@@ -64,6 +394,23 @@ class LLMService:
             api_key=api_key
         )
 
+    def _system_message(self, system_prompt: str) -> SystemMessage:
+        """
+        Wrap a system prompt so providers can reuse their prefix cache
+        across turns. Anthropic needs an explicit cache_control marker
+        on the block; OpenAI caches automatically as long as the prefix
+        bytes stay identical, which the callers here guarantee by
+        building prompts from fixed templates.
+        """
+        model_lower = self.model_name.lower()
+        if 'claude' in model_lower or 'anthropic' in model_lower:
+            return SystemMessage(content=[{
+                "type": "text",
+                "text": system_prompt,
+                "cache_control": {"type": "ephemeral"},
+            }])
+        return SystemMessage(content=system_prompt)
+
     def _extract_text_content(self, content: Any) -> str:
         """
         Extract text content from response.content which might be a string or list.
@@ -74,19 +421,7 @@ class LLMService:
         Returns:
             Extracted text as string
         """
-        if isinstance(content, str):
-            return content
-        elif isinstance(content, list):
-            # Extract text from content blocks
-            text_parts = []
-            for block in content:
-                if isinstance(block, dict) and block.get('type') == 'text':
-                    text_parts.append(block.get('text', ''))
-                elif isinstance(block, str):
-                    text_parts.append(block)
-            return ''.join(text_parts)
-        else:
-            return str(content)
+        return _extract_text(content)
 
     def _initialize_tools(self) -> List[Tool]:
         """
@@ -99,12 +434,29 @@ class LLMService:
         # If i need other tools later, i can add them here.
         return []
 
+    @staticmethod
+    def _window_history(messages: List, sink: int, recent: int) -> List:
+        """
+        Bound a conversation history to the first `sink` turns plus the
+        last `recent` turns. The opening turns anchor what the
+        conversation is about and the tail carries the live context;
+        the middle rarely changes the answer but grows the prompt (and
+        its cost) linearly with conversation length.
+        """
+        if len(messages) <= sink + recent:
+            return messages
+        return messages[:sink] + messages[-recent:]
+
     def _convert_db_messages_to_langchain(
         self,
         messages: List[DBMessage]
     ) -> List[BaseMessage]:
         """
         Convert database messages to LangChain message format.
+        Long histories are windowed (sink + recent turns) so prompt
+        size stays bounded per turn. Conversions are cached per
+        (conversation, last message), since a conversation's prefix
+        never changes between turns.
 
         Args:
             messages: List of database Message objects
@@ -112,13 +464,32 @@ class LLMService:
         Returns:
             List of LangChain BaseMessage objects
         """
-        langchain_messages = []
+        if not messages:
+            return []
+
+        last = messages[-1]
+        cache_key = None
+        if last.id is not None and last.conversation_id is not None:
+            cache_key = (last.conversation_id, last.id, len(messages))
+            cached = _HISTORY_CACHE.get(cache_key)
+            if cached is not None:
+                return list(cached)
+
+        windowed = self._window_history(
+            messages,
+            settings.HISTORY_SINK_TURNS,
+            settings.HISTORY_RECENT_TURNS,
+        )
+        langchain_messages = [
+            _MSG_CLS[msg.type](content=msg.content)
+            for msg in windowed
+            if msg.type in _MSG_CLS
+        ]
 
-        for msg in messages:
-            if msg.type == "human":
-                langchain_messages.append(HumanMessage(content=msg.content))
-            elif msg.type == "ai":
-                langchain_messages.append(AIMessage(content=msg.content))
+        if cache_key is not None:
+            if len(_HISTORY_CACHE) >= _HISTORY_CACHE_MAX:
+                _HISTORY_CACHE.pop(next(iter(_HISTORY_CACHE)), None)
+            _HISTORY_CACHE[cache_key] = tuple(langchain_messages)
 
         return langchain_messages
 
@@ -136,26 +507,51 @@ class LLMService:
         Returns:
             List of dictionaries with type and content
         """
-        formatted = []
-
-        for msg in messages:
-            if isinstance(msg, HumanMessage):
-                formatted.append({
-                    "type": "human",
-                    "data": {"content": msg.content}
-                })
-            elif isinstance(msg, AIMessage):
-                # Extract text content (handles both string and list formats)
-                text_content = self._extract_text_content(msg.content)
-                # Only include AIMessage if it has actual text (not just tool calls)
-                if text_content:
-                    formatted.append({
-                        "type": "ai",
-                        "data": {"content": text_content}
-                    })
-            # Skip ToolMessage, SystemMessage, and AIMessages that are just tool calls
-
-        return formatted
+        return [
+            entry
+            for msg in messages
+            if (handler := _FORMAT_DISPATCH.get(type(msg))) is not None
+            and (entry := handler(msg)) is not None
+        ]
+
+    async def _ainvoke(self, runnable, payload):
+        """Invoke a model/chain under the inflight cap."""
+        async with self._inflight:
+            return await runnable.ainvoke(payload)
+
+    async def _run_tool(self, tool_call: Dict[str, Any]) -> ToolMessage:
+        """
+        Execute a single tool call and wrap the outcome as a ToolMessage
+        (required by Anthropic). Async tools are awaited directly; sync
+        tools run in a worker thread so concurrent calls don't serialize
+        on the event loop.
+        """
+        tool_name = tool_call.get('name')
+        tool_args = tool_call.get('args', {})
+        tool_call_id = tool_call.get('id', '')
+
+        tool = self._tools_by_name.get(tool_name)
+        if tool is None:
+            return ToolMessage(
+                content=f"Error: unknown tool '{tool_name}'",
+                tool_call_id=tool_call_id
+            )
+
+        try:
+            query = tool_args.get('query', '')
+            if tool.coroutine is not None:
+                tool_result = await tool.coroutine(query)
+            else:
+                tool_result = await asyncio.to_thread(tool.func, query)
+            return ToolMessage(
+                content=str(tool_result),
+                tool_call_id=tool_call_id
+            )
+        except Exception as e:
+            return ToolMessage(
+                content=f"Error: {str(e)}",
+                tool_call_id=tool_call_id
+            )
 
     async def generate_response(
         self,
@@ -174,65 +570,159 @@ class LLMService:
         Returns:
             Tuple of (AI response, full conversation history)
         """
+        # Semantic cache only on history-free turns — mid-conversation
+        # the same words can mean something different
+        sem_vec = None
+        if settings.SEMANTIC_CACHE_ENABLED and not conversation_history:
+            sem_vec, cached = await asyncio.to_thread(
+                _SEM_CACHE.lookup, f"{system_prompt or ''}\n{user_message}"
+            )
+            if cached is not None:
+                return cached, self._format_message_history([
+                    HumanMessage(content=user_message),
+                    AIMessage(content=cached),
+                ])
+
         # Convert conversation history to LangChain format
         messages = []
 
         if conversation_history:
             messages = self._convert_db_messages_to_langchain(conversation_history)
 
-        # Add system prompt if provided
+        # Add system prompt if provided (marked for provider-side
+        # prefix caching — the RAG path sends multi-KB prompts here)
         if system_prompt:
-            messages.insert(0, SystemMessage(content=system_prompt))
+            messages.insert(0, self._system_message(system_prompt))
 
         # Add current user message
         messages.append(HumanMessage(content=user_message))
 
         # Bind tools to the LLM
-        llm_with_tools = self.llm.bind_tools(self.tools)
+        llm_with_tools = self.llm_with_tools
 
         # Generate response
-        response = await llm_with_tools.ainvoke(messages)
+        response = await self._ainvoke(llm_with_tools, messages)
 
         # Loop until we get a response without tool calls
         while hasattr(response, 'tool_calls') and response.tool_calls:
             # Add the AI's response with tool calls
             messages.append(response)
 
-            # Execute each tool call and add as ToolMessage
-            for tool_call in response.tool_calls:
-                tool_name = tool_call.get('name')
-                tool_args = tool_call.get('args', {})
-                tool_call_id = tool_call.get('id', '')
-
-                # Find and execute the tool
-                for tool in self.tools:
-                    if tool.name == tool_name:
-                        try:
-                            tool_result = tool.func(tool_args.get('query', ''))
-                            # Add tool result as ToolMessage (required by Anthropic)
-                            messages.append(ToolMessage(
-                                content=str(tool_result),
-                                tool_call_id=tool_call_id
-                            ))
-                        except Exception as e:
-                            messages.append(ToolMessage(
-                                content=f"Error: {str(e)}",
-                                tool_call_id=tool_call_id
-                            ))
-                        break
+            # Execute all tool calls concurrently — each is typically a
+            # DB/HTTP round-trip, so the round costs the slowest call
+            # instead of their sum. Results keep the original order.
+            messages.extend(await asyncio.gather(
+                *(self._run_tool(tool_call) for tool_call in response.tool_calls)
+            ))
 
             # Get next response - keep looping until no more tool calls
-            response = await llm_with_tools.ainvoke(messages)
+            response = await self._ainvoke(llm_with_tools, messages)
 
         # Now we have a response without tool calls - extract the text
         response_content = self._extract_text_content(response.content)
         messages.append(AIMessage(content=response_content))
 
+        if sem_vec is not None:
+            _SEM_CACHE.store(sem_vec, response_content)
+
         # Format history for return
         formatted_history = self._format_message_history(messages)
 
         return response_content, formatted_history
 
+    async def generate_response_stream(
+        self,
+        user_message: str,
+        conversation_history: Optional[List[DBMessage]] = None,
+        system_prompt: Optional[str] = None
+    ):
+        """
+        Stream a response token-by-token. Yields text chunks as they
+        arrive, so time-to-first-byte is per-token latency instead of
+        the full generation time.
+
+        Every round streams: chunks are aggregated as they pass
+        through, and if the assembled message carries tool calls the
+        tools run (concurrently) and streaming resumes with the next
+        round. Tool-call rounds emit no text, so nothing is yielded
+        prematurely.
+
+        Args:
+            user_message: The user's message
+            conversation_history: Optional list of previous messages
+            system_prompt: Optional system prompt to guide the model
+
+        Yields:
+            Text chunks of the AI response
+        """
+        messages = []
+
+        if conversation_history:
+            messages = self._convert_db_messages_to_langchain(conversation_history)
+
+        if system_prompt:
+            messages.insert(0, self._system_message(system_prompt))
+
+        messages.append(HumanMessage(content=user_message))
+
+        llm_with_tools = self.llm_with_tools
+
+        while True:
+            accumulated = None
+            async with self._inflight:
+                async for chunk in llm_with_tools.astream(messages):
+                    # AIMessageChunk addition merges content and
+                    # tool-call fragments into one complete message
+                    accumulated = chunk if accumulated is None else accumulated + chunk
+                    text = self._extract_text_content(chunk.content)
+                    if text:
+                        yield text
+
+            if accumulated is None or not getattr(accumulated, 'tool_calls', None):
+                return
+
+            messages.append(accumulated)
+            messages.extend(await asyncio.gather(
+                *(self._run_tool(tool_call) for tool_call in accumulated.tool_calls)
+            ))
+
+    async def generate_responses(
+        self,
+        user_messages: List[str],
+        conversation_history: Optional[List[DBMessage]] = None,
+        system_prompt: Optional[str] = None,
+        max_concurrency: Optional[int] = 32
+    ) -> List[Tuple[str, List[Dict[str, str]]]]:
+        """
+        Generate responses for several prompts concurrently. Submitting
+        the calls together overlaps their network round-trips and lets
+        the provider fuse them into one continuous decode batch; wall
+        clock is roughly one round-trip up to the concurrency cap.
+
+        Args:
+            user_messages: Prompts to answer
+            conversation_history: Optional shared previous messages
+            system_prompt: Optional shared system prompt
+            max_concurrency: Cap on simultaneously running prompts
+                (None for unlimited); provider calls are additionally
+                bounded by the service-wide inflight semaphore
+        """
+        if max_concurrency:
+            batch_sem = asyncio.Semaphore(max_concurrency)
+
+            async def _one(m: str):
+                async with batch_sem:
+                    return await self.generate_response(
+                        m, conversation_history, system_prompt
+                    )
+
+            return list(await asyncio.gather(*(_one(m) for m in user_messages)))
+
+        return list(await asyncio.gather(*(
+            self.generate_response(m, conversation_history, system_prompt)
+            for m in user_messages
+        )))
+
     async def generate_response_with_rag(
         self,
         user_message: str,
@@ -250,15 +740,11 @@ class LLMService:
         Returns:
             Tuple of (AI response, full conversation history)
         """
-        # Build RAG system prompt
-        context = "\n\n".join(context_documents)
-        system_prompt = f"""You are a helpful assistant. Use the following context to answer the user's question.
-If you cannot find the answer in the context, say so clearly.
-
-Context:
-{context}
-
-Answer the question based on the context above."""
+        # Build RAG system prompt from the frozen template; one join +
+        # one format, and identical doc sets yield identical bytes
+        system_prompt = _RAG_SYSTEM_TEMPLATE.format(
+            context="\n\n".join(context_documents)
+        )
 
         return await self.generate_response(
             user_message,
@@ -278,20 +764,29 @@ Answer the question based on the context above."""
         File-based "Agent" simulation. Generates SQL, executes via Spark, summarizes result.
         """
         try:
-             # 1. Generate SQL
-             print("DEBUG: Generating SQL for File Source...")
-             sql = await self.generate_sql_query(user_message, engine_config)
-             print(f"DEBUG: Generated SQL: {sql}")
-             
-             # 2. Execute SQL (Import locally to avoid circular dep)
+             # Import locally to avoid circular dep
              from app.services.etl_service import ETLService
-             
+
+             # 1. Generate SQL, warming the Spark session in parallel —
+             # the LLM round-trip and session startup are independent,
+             # so the slower of the two sets the pace instead of the sum
+             logger.debug("Generating SQL for file source")
+             loop = asyncio.get_running_loop()
+             sql, _ = await asyncio.gather(
+                 self.generate_sql_query(user_message, engine_config),
+                 loop.run_in_executor(None, ETLService.get_spark_session),
+             )
+             logger.debug("Generated SQL: %s", sql)
+
+             # 2. Execute SQL
+
              try:
-                 print("DEBUG: Executing SQL on Spark...")
+                 logger.debug("Executing SQL on Spark")
                  results = await ETLService.execute_sql_query(engine_config, sql)
-                 # Limit results for context window
-                 results_sample = results[:20] 
-                 results_str = str(results_sample)
+                 # JSON is unambiguous and more compact than Python repr;
+                 # the token budget caps the prompt regardless of row width
+                 results_str = orjson.dumps(results[:20], default=str).decode()
+                 results_str = _truncate_to_tokens(results_str, 3000, self.model_name)
                  if len(results) > 20:
                      results_str += f"\n... ({len(results) - 20} more rows)"
              except Exception as e:
@@ -307,8 +802,8 @@ Data Results:
 Answer the user's question based on the data results.
 If the results contain an error, explain it.
 """
-             print("DEBUG: Generating Final Answer...")
-             response = await self.llm.ainvoke([HumanMessage(content=prompt)])
+             logger.debug("Generating final answer")
+             response = await self._ainvoke(self._small_llm, [HumanMessage(content=prompt)])
              response_content = response.content
              
              # History
@@ -345,30 +840,35 @@ If the results contain an error, explain it.
             return await self._handle_file_source_agent(user_message, engine, conversation_history)
 
         try:
-            print(f"DEBUG: Initializing SQL Agent...")
-            # Initialize SQL Database
-            db = SQLDatabase(engine=engine)
-            print(f"DEBUG: SQL Database initialized. Dialect: {db.dialect}, Tables: {db.get_usable_table_names()}")
+            logger.debug("Initializing SQL agent")
+            # Initialize SQL Database (reflection cached per engine)
+            db, _, dialect = _get_cached_db(engine)
+            if logger.isEnabledFor(logging.DEBUG):
+                # get_usable_table_names is not free; only pay for it
+                # when DEBUG output is actually emitted
+                logger.debug("SQL database initialized. Dialect: %s, Tables: %s",
+                             dialect, db.get_usable_table_names())
 
             # Create SQL Agent
             agent_executor = create_sql_agent(
                 llm=self.llm,
                 db=db,
                 agent_type="openai-tools",
-                verbose=True
+                verbose=settings.LANGCHAIN_VERBOSE
             )
 
             # Format history for context
             full_prompt = user_message
             if conversation_history:
-                 # Provide last few messages as context
-                 history_text = "\n".join([f"{msg.type}: {msg.content}" for msg in conversation_history[-4:]])
+                 # Provide anchor + recent messages as context
+                 windowed = self._window_history(conversation_history, sink=1, recent=4)
+                 history_text = "\n".join([f"{msg.type}: {msg.content}" for msg in windowed])
                  full_prompt = f"Previous conversation:\n{history_text}\n\nCurrent User Query: {user_message}"
 
-            print(f"DEBUG: Invoking SQL Agent with prompt: {full_prompt}")
+            logger.debug("Invoking SQL agent with prompt: %s", full_prompt)
             # Execute Agent
             response = await agent_executor.ainvoke({"input": full_prompt})
-            print(f"DEBUG: SQL Agent Response: {response}")
+            logger.debug("SQL agent response: %s", response)
             response_content = response.get("output", "I could not generate an answer from the database.")
             
             # Re-convert existing history
@@ -385,7 +885,7 @@ If the results contain an error, explain it.
 
         except Exception as e:
             error_msg = f"SQL Agent Error: {str(e)}"
-            print(error_msg)
+            logger.error("SQL agent error: %s", e)
             return error_msg, []
 
     async def generate_chart_config(
@@ -393,7 +893,8 @@ If the results contain an error, explain it.
         user_message: str,
         data_sample: List[Dict[str, Any]],
         columns: List[str],
-        previous_config: Optional[Dict[str, Any]] = None
+        previous_config: Optional[Dict[str, Any]] = None,
+        model_tier: str = "small"
     ) -> ChartConfig:
         """
         Generate a chart configuration based on the user's request and data sample.
@@ -403,14 +904,15 @@ If the results contain an error, explain it.
             data_sample: A sample of the data (rows)
             columns: List of column names
             previous_config: Optional previous configuration to refine
+            model_tier: "small" (default) or "primary"
 
         Returns:
             ChartConfig object
         """
-        refinement_context = ""
         if previous_config:
-            import json
-            config_str = json.dumps(previous_config, indent=2)
+            config_str = orjson.dumps(
+                previous_config, default=str, option=orjson.OPT_INDENT_2
+            ).decode()
             refinement_context = f"""
 - Previous Configuration:
 {config_str}
@@ -423,58 +925,53 @@ The user wants to MODIFY the previous chart.
 4. If the user asks to change the data/metric, update the 'series' and 'xAxis' accordingly.
 """
         else:
-            refinement_context = """
-Rules:
-1. Choose 'bar', 'line', 'pie', or 'scatter' appropriate for the data.
-2. Map 'series' and 'xAxis' correctly.
-3. For Bar/Line charts: 'xAxis' usually contains the labels/categories (scaleType='band' for categories, 'point' for time/linear).
-4. `series` data MUST be extracted from the provided `data_sample`.
-5. Return a valid JSON matching the ChartConfig schema.
-"""
+            refinement_context = _CHART_FRESH_RULES
 
-        system_msg_template = """You are an expert Data Visualization Architect using MUI X Charts.
-Your goal is to choose the best chart type to visualize the provided data based on the user's request.
-Internalize the data structure and schema.
-
-Input Context:
-- Columns: {columns}
-- Data Sample (first 5 rows): {data_sample}
-
-{refinement_context}
-"""
-
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", system_msg_template),
-            ("human", "{user_message}"),
-        ])
-
-        chain = prompt | self.llm.with_structured_output(ChartConfig)
-        
         try:
             safe_sample = data_sample[:5]
-            result = await chain.ainvoke({
+
+            cache_key = _cache_key(
+                "chart",
+                _normalize_message(user_message),
+                orjson.dumps(columns, option=orjson.OPT_SORT_KEYS).decode(),
+                orjson.dumps(safe_sample, default=str).decode(),
+                orjson.dumps(previous_config, default=str).decode() if previous_config else "",
+            )
+            cached_config = _cache_get(cache_key)
+            if cached_config is not None:
+                # Copy so callers mutating the config don't poison the cache
+                return cached_config.model_copy(deep=True)
+
+            chain = self._chart_chain_primary if model_tier == "primary" else self._chart_chain
+            result = await self._ainvoke(chain, {
                 "columns": columns,
-                "data_sample": safe_sample,
+                # JSON rather than Python repr: unambiguous for the
+                # model and serialized in C instead of str()
+                "data_sample": orjson.dumps(safe_sample, default=str).decode(),
                 "user_message": user_message,
                 "refinement_context": refinement_context
             })
+            if result is not None:
+                _cache_put(cache_key, result.model_copy(deep=True))
             return result
         except Exception as e:
-            print(f"Error generating chart config: {e}")
+            logger.error("Error generating chart config: %s", e)
             raise e
 
     async def generate_sql_query(
         self,
         user_message: str,
-        engine: Any
+        engine: Any,
+        model_tier: str = "small"
     ) -> str:
         """
         Generate SQL query from natural language.
-        
+
         Args:
             user_message: User's request
             engine: SQLAlchemy Engine
-            
+            model_tier: "small" (default) or "primary"
+
         Returns:
             SQL Query string
         """
@@ -487,11 +984,16 @@ Input Context:
                 schema = f"Table: {engine.get('view_name')}\nColumns:\n{engine.get('schema_info', 'Unknown')}"
                 dialect = "Spark SQL"
             else:
-                # Handle SQLAlchemy Engine
-                db = SQLDatabase(engine=engine)
-                schema = db.get_table_info()
-                dialect = db.dialect
-            
+                # Handle SQLAlchemy Engine (reflection cached per engine)
+                _, schema, dialect = _get_cached_db(engine)
+
+            cache_key = _cache_key(
+                "sql", str(dialect), schema, _normalize_message(user_message)
+            )
+            cached_sql = _cache_get(cache_key)
+            if cached_sql is not None:
+                return cached_sql
+
             prompt = f"""You are an expert SQL Data Analyst.
 Target Database Dialect: {dialect}
 
@@ -506,28 +1008,51 @@ Do not include explanations.
 If you use markdown, I will strip it, but prefer raw text.
 """
             
-            response = await self.llm.ainvoke([HumanMessage(content=prompt)])
-            sql = response.content.strip()
-            
+            llm = self.llm if model_tier == "primary" else self._small_llm
+            response = await self._ainvoke(llm, [HumanMessage(content=prompt)])
             # Clean up SQL (sometimes markdown blocks are included)
-            if sql.startswith("```sql"):
-                sql = sql[6:]
-            if sql.startswith("```"):
-                sql = sql[3:]
-            if sql.endswith("```"):
-                sql = sql[:-3]
-            if "SQLQuery:" in sql:
-                sql = sql.split("SQLQuery:")[1]
-            
-            return sql.strip()
+            sql = _clean_sql(response.content)
+            _cache_put(cache_key, sql)
+            return sql
         except Exception as e:
-            print(f"Error generating SQL: {e}")
+            logger.error("Error generating SQL: %s", e)
             raise e
 
 
 class LLMFactory:
     """Factory for creating LLM service instances based on user settings."""
 
+    # Service instances pooled by their full parameter set. An
+    # LLMService only holds configuration plus prebuilt chains, so
+    # requests with the same settings can share one instance — and with
+    # it the chat model's HTTP connection pool and inflight semaphore.
+    # Lookups happen on the event-loop thread, so a plain dict is safe.
+    _pool: Dict[Tuple[str, Optional[str], float, int], LLMService] = {}
+
+    @classmethod
+    def get_service(
+        cls,
+        model_name: str,
+        api_key: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000
+    ) -> LLMService:
+        """
+        Return the pooled LLMService for these parameters, creating it
+        on first use.
+        """
+        key = (model_name, api_key, temperature, max_tokens)
+        service = cls._pool.get(key)
+        if service is None:
+            service = LLMService(
+                model_name=model_name,
+                api_key=api_key,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+            cls._pool[key] = service
+        return service
+
     @staticmethod
     def create_from_settings(
         model_setting: Dict[str, Any]
@@ -545,7 +1070,7 @@ class LLMFactory:
         Returns:
             Configured LLMService instance
         """
-        return LLMService(
+        return LLMFactory.get_service(
             model_name=model_setting.get("name"),
             api_key=model_setting.get("api_key"),
             temperature=model_setting.get("temperature", 0.7),
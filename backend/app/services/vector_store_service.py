@@ -2,13 +2,24 @@
 Vector Store Service - Manages embeddings and retrieval using ChromaDB.
 Supports RAG (Retrieval-Augmented Generation) for document-based chat.
 """
+import asyncio
+import uuid
 from typing import List, Optional, Dict, Any
 import chromadb
+import numpy as np
 from langchain_chroma import Chroma
 from langchain_core.documents import Document
 from app.core.config import settings
 from app.services.embeddings_models import EmbeddingModelFactory
 
+# Chroma clients keyed by (host, port). Building a fresh HttpClient
+# per VectorStoreService costs TCP setup plus a heartbeat round-trip
+# on every request that touches a vector store; one client per server
+# makes construction free after the first. The heartbeat runs only
+# when the client is first created — afterwards operations fail
+# loudly on their own if the server goes away.
+_CHROMA_CLIENTS: Dict[tuple, chromadb.ClientAPI] = {}
+
 
 class VectorStoreService:
     """
@@ -56,20 +67,26 @@ class VectorStoreService:
         Returns:
             ChromaDB client instance
         """
+        key = (settings.CHROMA_HOST, settings.CHROMA_PORT)
+        client = _CHROMA_CLIENTS.get(key)
+        if client is not None:
+            return client
+
         try:
             # Try to connect to ChromaDB server
             client = chromadb.HttpClient(
                 host=settings.CHROMA_HOST,
                 port=settings.CHROMA_PORT
             )
-            # Test connection
+            # Test connection (first construction only)
             client.heartbeat()
-            return client
         except Exception as e:
             print(f"Warning: Could not connect to ChromaDB server: {e}")
             print("Falling back to in-memory ChromaDB")
             # Fall back to in-memory client for development
-            return chromadb.Client()
+            client = chromadb.Client()
+
+        return _CHROMA_CLIENTS.setdefault(key, client)
 
     def _initialize_embeddings(self):
         """
@@ -117,12 +134,35 @@ class VectorStoreService:
         Returns:
             List of document IDs
         """
-        documents = [
-            Document(page_content=text, metadata=meta or {})
-            for text, meta in zip(texts, metadatas or [{}] * len(texts))
-        ]
-
-        return self.vector_store.add_documents(documents, ids=ids)
+        if not texts:
+            return []
+
+        # Embed the whole batch in one call — sentence-transformers
+        # vectorizes the list in a few forward passes and the OpenAI
+        # backend sends one request instead of one per text. Runs in a
+        # worker thread so the event loop isn't pinned for the duration.
+        embeddings = await asyncio.to_thread(
+            self.embeddings.embed_documents, texts
+        )
+        # float32 ndarray: the Chroma client ships ndarrays compactly
+        # instead of boxing every component as a Python float
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+
+        if ids is None:
+            ids = [uuid.uuid4().hex for _ in texts]
+
+        # Hand the precomputed vectors straight to the collection;
+        # going through Chroma.add_documents would re-embed per batch.
+        # upsert skips add's duplicate-ID failure path and makes
+        # re-ingesting the same file idempotent.
+        await asyncio.to_thread(
+            self.vector_store._collection.upsert,
+            ids=ids,
+            documents=texts,
+            metadatas=metadatas if metadatas else None,
+            embeddings=embeddings,
+        )
+        return ids
 
     async def similarity_search(
         self,
@@ -180,13 +220,27 @@ class VectorStoreService:
         self.vector_store.delete(ids=ids)
 
     async def clear_collection(self) -> None:
-        """Delete all documents from the collection."""
+        """Delete all documents from the collection.
+
+        Truncates in place rather than dropping and recreating the
+        collection — that keeps the Chroma wrapper, embedding-function
+        binding, and collection metadata intact, and skips the
+        recreate round-trip. Drop/recreate remains the fallback if the
+        in-place delete fails.
+        """
         try:
-            self.client.delete_collection(self.collection_name)
-            # Reinitialize the vector store
-            self.vector_store = self._initialize_vector_store()
+            collection = self.vector_store._collection
+            ids = collection.get(include=[])["ids"]
+            if ids:
+                collection.delete(ids=ids)
         except Exception as e:
-            print(f"Error clearing collection: {e}")
+            print(f"Error clearing collection in place, recreating: {e}")
+            try:
+                self.client.delete_collection(self.collection_name)
+                # Reinitialize the vector store
+                self.vector_store = self._initialize_vector_store()
+            except Exception as e:
+                print(f"Error clearing collection: {e}")
 
     async def delete(self) -> None:
         """Delete the collection permanently."""
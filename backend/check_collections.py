@@ -1,14 +1,35 @@
 """
 Quick script to check ChromaDB collections and their contents.
+
+Collections are described concurrently — count + sample fetch per
+collection runs in a worker thread — and printed in order afterwards.
 """
+import asyncio
 import chromadb
 
 # Connect to ChromaDB
 client = chromadb.HttpClient(host="localhost", port=8001)
 
-try:
+
+def describe(collection) -> str:
+    """Build the report block for one collection (runs in a thread)."""
+    count = collection.count()
+    lines = [f"\nCollection: {collection.name}", f"  Count: {count} documents"]
+
+    # Get a few sample documents
+    if count > 0:
+        results = collection.get(limit=3, include=['metadatas', 'documents'])
+        lines.append("  Sample documents:")
+        for i, (doc, metadata) in enumerate(zip(results['documents'], results['metadatas'])):
+            lines.append(f"    [{i+1}] {doc[:100]}...")
+            lines.append(f"        Metadata: {metadata}")
+
+    return "\n".join(lines)
+
+
+async def main():
     # List all collections
-    collections = client.list_collections()
+    collections = await asyncio.to_thread(client.list_collections)
 
     print("=" * 60)
     print("CHROMADB COLLECTIONS")
@@ -17,20 +38,19 @@ try:
     if not collections:
         print("No collections found!")
     else:
-        for collection in collections:
-            print(f"\nCollection: {collection.name}")
-            print(f"  Count: {collection.count()} documents")
-
-            # Get a few sample documents
-            if collection.count() > 0:
-                results = collection.get(limit=3, include=['metadatas', 'documents'])
-                print(f"  Sample documents:")
-                for i, (doc, metadata) in enumerate(zip(results['documents'], results['metadatas'])):
-                    print(f"    [{i+1}] {doc[:100]}...")
-                    print(f"        Metadata: {metadata}")
+        reports = await asyncio.gather(*(
+            asyncio.to_thread(describe, collection)
+            for collection in collections
+        ))
+        for report in reports:
+            print(report)
 
     print("\n" + "=" * 60)
 
-except Exception as e:
-    print(f"Error connecting to ChromaDB: {e}")
-    print("Make sure ChromaDB is running on localhost:8001")
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except Exception as e:
+        print(f"Error connecting to ChromaDB: {e}")
+        print("Make sure ChromaDB is running on localhost:8001")
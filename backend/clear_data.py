@@ -1,15 +1,21 @@
 """
 Script to clear all ChromaDB collections and PostgreSQL data sources.
+
+Both systems are cleared concurrently: collection deletes fan out to
+worker threads while Postgres truncates, so wall clock is the slower
+of the two instead of their sum.
 """
+import asyncio
 import chromadb
-import psycopg2
+import asyncpg
 from app.core.config import settings
 
-def clear_chromadb():
+
+async def clear_chromadb():
     """Clear all ChromaDB collections."""
     try:
         client = chromadb.HttpClient(host="localhost", port=8001)
-        collections = client.list_collections()
+        collections = await asyncio.to_thread(client.list_collections)
 
         print("=" * 60)
         print("CLEARING CHROMADB COLLECTIONS")
@@ -18,9 +24,12 @@ def clear_chromadb():
         if not collections:
             print("No collections found!")
         else:
+            await asyncio.gather(*(
+                asyncio.to_thread(client.delete_collection, collection.name)
+                for collection in collections
+            ))
             for collection in collections:
-                print(f"Deleting collection: {collection.name}")
-                client.delete_collection(collection.name)
+                print(f"Deleted collection: {collection.name}")
             print(f"\nDeleted {len(collections)} collections")
 
         print("=" * 60)
@@ -28,42 +37,39 @@ def clear_chromadb():
     except Exception as e:
         print(f"Error clearing ChromaDB: {e}")
 
-def clear_postgres_data_sources():
+
+async def clear_postgres_data_sources():
     """Clear all data sources from PostgreSQL."""
     try:
-        # Connect to PostgreSQL
-        conn = psycopg2.connect(
-            host="localhost",
-            port=5433,
-            database=settings.POSTGRES_DB,
-            user=settings.POSTGRES_USER,
-            password=settings.POSTGRES_PASSWORD
-        )
-        cursor = conn.cursor()
+        # asyncpg wants a plain postgresql:// DSN
+        dsn = settings.DATABASE_URL.replace("+asyncpg", "")
+        conn = await asyncpg.connect(dsn)
 
         print("\n" + "=" * 60)
         print("CLEARING POSTGRESQL DATA SOURCES")
         print("=" * 60)
 
         # Count existing data sources
-        cursor.execute("SELECT COUNT(*) FROM data_sources;")
-        count = cursor.fetchone()[0]
+        count = await conn.fetchval("SELECT COUNT(*) FROM data_sources;")
         print(f"Found {count} data sources")
 
-        # Delete all data sources
-        cursor.execute("DELETE FROM data_sources;")
-        conn.commit()
+        # TRUNCATE reclaims the table in one pass instead of deleting
+        # (and WAL-logging) row by row; CASCADE covers dependents
+        await conn.execute("TRUNCATE data_sources CASCADE;")
 
         print(f"Deleted {count} data sources")
         print("=" * 60)
 
-        cursor.close()
-        conn.close()
+        await conn.close()
 
     except Exception as e:
         print(f"Error clearing PostgreSQL: {e}")
 
-if __name__ == "__main__":
-    clear_chromadb()
-    clear_postgres_data_sources()
+
+async def main():
+    await asyncio.gather(clear_chromadb(), clear_postgres_data_sources())
     print("\n✓ Cleanup complete!")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
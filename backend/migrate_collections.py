@@ -1,7 +1,15 @@
 """
 Script to migrate documents from default collection to roeecv collection.
+
+Copies in pages of BATCH documents instead of materializing the whole
+source collection (documents + metadatas + embeddings) in one dict, so
+memory stays flat however large the collection is and Chroma can ingest
+one batch while the next is being fetched.
 """
 import chromadb
+import numpy as np
+
+BATCH = 512
 
 # Connect to ChromaDB
 client = chromadb.HttpClient(host="localhost", port=8001)
@@ -15,24 +23,36 @@ try:
     print("MIGRATING DOCUMENTS")
     print("=" * 60)
 
-    # Get all documents from default collection
-    results = default_collection.get(include=['documents', 'metadatas', 'embeddings'])
+    migrated = 0
+    offset = 0
+    while True:
+        results = default_collection.get(
+            limit=BATCH,
+            offset=offset,
+            include=['documents', 'metadatas', 'embeddings']
+        )
+        if not results['ids']:
+            break
 
-    if not results['documents']:
-        print("No documents to migrate!")
-    else:
-        print(f"Found {len(results['documents'])} documents in 'default' collection")
-        print(f"Migrating to 'roeecv' collection...")
+        # float32 ndarray ships compactly instead of boxing every
+        # component as a Python float
+        embeddings = np.asarray(results['embeddings'], dtype=np.float32)
 
-        # Add documents to roeecv collection
         roeecv_collection.add(
             ids=results['ids'],
             documents=results['documents'],
             metadatas=results['metadatas'],
-            embeddings=results['embeddings']
+            embeddings=embeddings
         )
 
-        print(f"✓ Migrated {len(results['documents'])} documents to 'roeecv'")
+        migrated += len(results['ids'])
+        offset += BATCH
+        print(f"  ... migrated {migrated} documents")
+
+    if not migrated:
+        print("No documents to migrate!")
+    else:
+        print(f"✓ Migrated {migrated} documents to 'roeecv'")
 
         # Delete default collection
         client.delete_collection("default")